@@ -0,0 +1,165 @@
+from typing import List, NamedTuple, Optional
+import asyncio
+import logging
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from . import db
+from .events import get_events_redis, queue_completed
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 100
+MAX_WAIT_S = 0.005
+
+
+class _Completion(NamedTuple):
+    oid: ObjectId
+    fields: dict
+    review_id: str
+    payload: Optional[dict]
+    code_hash: Optional[str]
+    future: asyncio.Future
+
+
+class CompletionBatcher:
+    """
+    Coalesces completion writes from concurrent reviews.
+
+    Completions queued within MAX_WAIT_S of each other are committed together:
+    one Mongo bulk_write for the submission updates, then one Redis pipeline
+    with every cache SET and 'completed' PUBLISH. The Mongo write lands first
+    so SSE clients that react to the event read a completed submission.
+    The bulk write is unordered, so an op that fails only fails its own
+    caller; the rest of the batch is still cached and published.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT_S):
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def submit(
+        self,
+        oid: ObjectId,
+        fields: dict,
+        review_id: str,
+        payload: Optional[dict] = None,
+        code_hash: Optional[str] = None,
+    ):
+        """Queue a completion and wait until its batch is committed."""
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            _Completion(oid, fields, review_id, payload, code_hash, future)
+        )
+        await future
+
+    async def _run(self):
+        while True:
+            items = [await self._queue.get()]
+            try:
+                await asyncio.sleep(self._max_wait)
+            except asyncio.CancelledError:
+                # Nothing written yet; the held item is failed like a queued one
+                _fail(items, RuntimeError("completion batcher closed"))
+                raise
+            while len(items) < self._max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            # Shielded so close() can't abandon a batch between the Mongo
+            # write and the publish; close() waits for it instead
+            self._inflight = asyncio.ensure_future(self._flush(items))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _flush(self, items: List[_Completion]):
+        try:
+            await db.submissions.bulk_write(
+                [UpdateOne({"_id": it.oid}, {"$set": it.fields}) for it in items],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            # Unordered: every op without a write error was applied
+            errors = {we["index"]: we for we in e.details.get("writeErrors", [])}
+            if not errors:
+                # Write-concern failure only; the outcome of every op is unknown
+                logger.error(f"completion_batch_failed size={len(items)} error={str(e)}")
+                _fail(items, e)
+                return
+            for i, we in errors.items():
+                logger.error(
+                    f"completion_write_failed submission_id={items[i].oid} "
+                    f"code={we.get('code')} error={we.get('errmsg')}"
+                )
+                _fail([items[i]], e)
+            items = [it for i, it in enumerate(items) if i not in errors]
+        except Exception as e:
+            logger.error(f"completion_batch_failed size={len(items)} error={str(e)}")
+            _fail(items, e)
+            return
+
+        if not items:
+            return
+
+        try:
+            r = await get_events_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                for it in items:
+                    queue_completed(
+                        pipe, str(it.oid), it.review_id, it.payload, it.code_hash
+                    )
+                await pipe.execute()
+        except Exception as e:
+            # Cache/events are best-effort, same as publish_status
+            logger.error(f"completion_publish_failed size={len(items)} error={str(e)}")
+
+        logger.debug(f"completion_batch_flushed size={len(items)}")
+        for it in items:
+            if not it.future.done():
+                it.future.set_result(None)
+
+    async def close(self):
+        """Stop the flusher, finish any in-flight batch, fail queued items."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher = None
+        if self._inflight is not None:
+            try:
+                await self._inflight
+            except Exception:
+                pass
+            self._inflight = None
+        items = []
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        _fail(items, RuntimeError("completion batcher closed"))
+
+
+def _fail(items: List[_Completion], exc: Exception):
+    for it in items:
+        if not it.future.done():
+            it.future.set_exception(exc)
+
+
+_batcher: Optional[CompletionBatcher] = None
+
+
+async def get_batcher() -> CompletionBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = CompletionBatcher()
+    return _batcher
+
+
+async def close_batcher():
+    global _batcher
+    if _batcher is not None:
+        await _batcher.close()
+        _batcher = None
@@ -1,10 +1,27 @@
 from typing import Optional
-import hashlib
-from redis.asyncio import Redis, from_url
+from blake3 import blake3
+from cachetools import TTLCache
+from redis.asyncio import Redis
 from .config import settings
+from .redis_pool import get_pool
 
 _redis: Optional[Redis] = None
 
+# Bumped whenever code_hash changes algorithm or normalization, so entries
+# written under the old scheme are never looked up with the new one
+HASH_VERSION = "v2"
+
+# In-process tier in front of Redis. Cached values are immutable review IDs,
+# so the only staleness is a recent miss, which is kept just long enough to
+# absorb bursts of identical unknown submissions.
+_local: TTLCache = TTLCache(
+    maxsize=int(settings.CACHE_LOCAL_SIZE), ttl=int(settings.CACHE_LOCAL_TTL_SECONDS)
+)
+_local_miss: TTLCache = TTLCache(
+    maxsize=int(settings.CACHE_LOCAL_SIZE),
+    ttl=int(settings.CACHE_LOCAL_MISS_TTL_SECONDS),
+)
+
 
 def _k(s: str) -> str:
     return f"{settings.CACHE_PREFIX}{s}"
@@ -13,7 +30,7 @@ def _k(s: str) -> str:
 async def init_cache(url: Optional[str] = None) -> Redis:
     global _redis
     if _redis is None:
-        _redis = from_url(url or settings.CACHE_REDIS_URL, decode_responses=True)
+        _redis = Redis(connection_pool=get_pool(url or settings.CACHE_REDIS_URL))
     return _redis
 
 
@@ -32,15 +49,33 @@ async def close_cache():
         _redis = None
 
 
-def _normalize(language: str, code: str) -> str:
-    lang = (language or "").strip().lower()
-    lines = [ln.rstrip() for ln in (code or "").strip().splitlines()]
-    return lang + "\n" + "\n".join(lines)
+def review_cache_key(code_hash: str, scope: str = "public") -> str:
+    """Redis key holding the cached review ID for a code hash."""
+    return _k(f"codehash:{HASH_VERSION}:{scope}:{code_hash}")
+
+
+def remember_review_id(key: str, review_id: str):
+    """Record a review ID in the in-process tier for a cache key."""
+    _local[key] = review_id
+    _local_miss.pop(key, None)
 
 
 def code_hash(language: str, code: str) -> str:
-    h = hashlib.sha256()
-    h.update(_normalize(language, code).encode("utf-8"))
+    """
+    Hash of the normalized submission: lowercased language, a newline, then
+    the stripped code with trailing whitespace removed from each line.
+
+    Lines are fed to the hasher one at a time instead of building the joined
+    string, so large pastes are not copied and re-encoded as a whole. The
+    digest is only a cache key, so BLAKE3 is used over SHA-256 for speed.
+    """
+    h = blake3()
+    h.update((language or "").strip().lower().encode("utf-8"))
+    h.update(b"\n")
+    for i, ln in enumerate((code or "").strip().splitlines()):
+        if i:
+            h.update(b"\n")
+        h.update(ln.rstrip().encode("utf-8"))
     return h.hexdigest()
 
 
@@ -49,34 +84,21 @@ async def cache_get_review_id(code_hash: str, scope: str = "public") -> Optional
     Get cached review ID for a code hash.
     
     Args:
-        code_hash: SHA-256 hash of normalized code
+        code_hash: BLAKE3 hash of normalized code
         scope: Optional scope for cache key (default: "public")
                Allows future per-user/org scoping without breaking existing cache
     """
+    key = review_cache_key(code_hash, scope)
+    hit = _local.get(key)
+    if hit is not None:
+        return hit
+    if key in _local_miss:
+        return None
+
     r = await get_cache()
-    # Try new format first (with scope)
-    key = _k(f"codehash:{scope}:{code_hash}")
     result = await r.get(key)
     if result:
-        return result
-    # Fallback to old format (backward compatibility)
-    old_key = _k(f"codehash:{code_hash}")
-    return await r.get(old_key)
-
-
-async def cache_set_review_id(
-    code_hash: str, review_id: str, ttl: Optional[int] = None, scope: str = "public"
-):
-    """
-    Cache review ID for a code hash.
-    
-    Args:
-        code_hash: SHA-256 hash of normalized code
-        review_id: Review ID to cache
-        ttl: Optional TTL in seconds (default: from settings)
-        scope: Optional scope for cache key (default: "public")
-               Allows future per-user/org scoping without breaking existing cache
-    """
-    r = await get_cache()
-    key = _k(f"codehash:{scope}:{code_hash}")
-    await r.set(key, review_id, ex=ttl or int(settings.CACHE_TTL_SECONDS))
+        _local[key] = result
+    else:
+        _local_miss[key] = True
+    return result
@@ -18,6 +18,12 @@ class Settings(BaseSettings):
     CACHE_REDIS_URL: str = "redis://localhost:6379/2"
     CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30
     CACHE_PREFIX: str = "acrev:"
+    CACHE_LOCAL_SIZE: int = 10_000
+    CACHE_LOCAL_TTL_SECONDS: int = 60
+    CACHE_LOCAL_MISS_TTL_SECONDS: int = 5
+
+    REDIS_POOL_SIZE: int = 50
+    EVENTS_SUBSCRIBER_QUEUE_SIZE: int = 8
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -2,12 +2,26 @@ from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from .config import settings
 from .indexes import ensure_indexes
+from .migrations import run_migrations
 
 client: Optional[AsyncIOMotorClient] = None
 db = None
 submissions = None
 reviews = None
 
+# Review fields copied onto the submission at completion, so listings can
+# filter and render from the submissions collection alone
+REVIEW_SUMMARY_FIELDS = ("score", "issues", "security", "performance", "suggestions")
+
+
+def review_summary(review: dict) -> dict:
+    """Denormalized review fields to $set on a completed submission."""
+    out = {"score": review.get("score")}
+    for field in REVIEW_SUMMARY_FIELDS[1:]:
+        out[field] = review.get(field) or []
+    out["issues_count"] = len(out["issues"])
+    return out
+
 
 async def init_db():
     global client, db, submissions, reviews
@@ -26,6 +40,7 @@ async def init_db():
     reviews = db["reviews"]
 
     await ensure_indexes(db)
+    await run_migrations(db)
 
 
 async def close_db():
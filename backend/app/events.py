@@ -1,12 +1,19 @@
-from typing import Optional, AsyncGenerator
-import json
+from typing import Optional, AsyncGenerator, Dict, List
+import asyncio
+import orjson
 import logging
-from redis.asyncio import Redis, from_url
+from redis.asyncio import Redis
 from .config import settings
+from .redis_pool import get_pool
+from .cache import review_cache_key, remember_review_id
 
 logger = logging.getLogger(__name__)
 
 _redis: Optional[Redis] = None
+_hub: Optional["EventsHub"] = None
+
+CHANNEL_PATTERN = "submission:*:status"
+TERMINAL_STATUSES = ("completed", "failed")
 
 
 async def init_events(url: Optional[str] = None) -> Redis:
@@ -14,7 +21,7 @@ async def init_events(url: Optional[str] = None) -> Redis:
     global _redis
     if _redis is None:
         # Use cache Redis URL for Pub/Sub (same Redis instance, different purpose)
-        _redis = from_url(url or settings.CACHE_REDIS_URL, decode_responses=True)
+        _redis = Redis(connection_pool=get_pool(url or settings.CACHE_REDIS_URL))
     return _redis
 
 
@@ -28,8 +35,11 @@ async def get_events_redis() -> Redis:
 
 
 async def close_events():
-    """Close Redis connection for events."""
-    global _redis
+    """Close the events hub and Redis connection for events."""
+    global _redis, _hub
+    if _hub is not None:
+        await _hub.close()
+        _hub = None
     if _redis is not None:
         await _redis.aclose()
         _redis = None
@@ -40,6 +50,162 @@ def _channel_name(submission_id: str) -> str:
     return f"submission:{submission_id}:status"
 
 
+def _submission_from_channel(channel: str) -> str:
+    """Extract the submission ID from a status channel name."""
+    return channel.split(":", 2)[1]
+
+
+def encode_done(status: str, review: Optional[dict] = None) -> str:
+    """Encode the SSE 'done' event data for a terminal status."""
+    payload = {"status": status}
+    if review is not None:
+        payload["review"] = review
+    return orjson.dumps(payload).decode()
+
+
+def _put_latest(queue: asyncio.Queue, item):
+    """
+    Enqueue without blocking, dropping the oldest entry if the queue is full.
+
+    Only the latest status matters to a subscriber, so a slow SSE client
+    loses stale transitions instead of backing up the shared reader (and,
+    behind it, Redis's pubsub output buffer).
+    """
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+
+
+class EventsHub:
+    """
+    Per-process Pub/Sub demultiplexer.
+
+    Holds a single PSUBSCRIBE connection for all submission status channels
+    and fans incoming messages out to per-submission subscriber queues, so
+    the number of Redis subscriber connections stays constant regardless of
+    how many SSE clients are connected.
+    """
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._subs: Dict[str, List[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+
+    async def _ensure_reader(self):
+        async with self._lock:
+            if self._reader is not None and not self._reader.done():
+                return
+            # PubSub checks a connection out of the pool and keeps it for its
+            # whole lifetime, so the subscriber still gets a dedicated socket
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.psubscribe(CHANNEL_PATTERN)
+            self._pubsub = pubsub
+            self._reader = asyncio.create_task(self._read_loop(pubsub))
+            logger.info(f"events_hub_started pattern={CHANNEL_PATTERN}")
+
+    async def _read_loop(self, pubsub):
+        # listen() blocks in the socket read, so an idle hub costs no wakeups
+        try:
+            # Subscribe confirmations are dropped by redis-py, so only
+            # pmessages reach this loop
+            async for message in pubsub.listen():
+                submission_id = _submission_from_channel(message["channel"])
+                if submission_id not in self._subs:
+                    continue
+                try:
+                    # Parsed once here, then shared by every subscriber queue
+                    data = orjson.loads(message["data"])
+                except (orjson.JSONDecodeError, TypeError) as e:
+                    logger.error(f"event_parse_error submission_id={submission_id} error={str(e)}")
+                    continue
+                if data.get("review") and data.get("status") in TERMINAL_STATUSES:
+                    # Every SSE client of this submission sends the same 'done'
+                    # body, so encode the embedded review once for all of them
+                    data["done_data"] = encode_done(data["status"], data["review"])
+                self._dispatch(submission_id, data)
+            # listen() only returns when the connection went away under us
+            raise ConnectionError("events subscriber stopped")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"events_hub_reader_error error={str(e)}")
+            self._fail_all(e)
+        finally:
+            # Shielded so a second cancel during shutdown can't leak the connection
+            await asyncio.shield(self._release(pubsub))
+
+    async def _release(self, pubsub):
+        if self._pubsub is pubsub:
+            self._pubsub = None
+        try:
+            await pubsub.punsubscribe(CHANNEL_PATTERN)
+        except Exception:
+            pass
+        finally:
+            await pubsub.aclose()
+
+    def _dispatch(self, submission_id: str, data: dict):
+        """Fan a message read from Redis out to the submission's queues."""
+        for queue in self._subs.get(submission_id, ()):
+            _put_latest(queue, data)
+
+    def _fail_all(self, exc: Exception):
+        """Wake every subscriber with an error so callers can fall back."""
+        for queues in self._subs.values():
+            for queue in queues:
+                _put_latest(queue, exc)
+
+    async def register(self, submission_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(
+            maxsize=int(settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+        )
+        self._subs.setdefault(submission_id, []).append(queue)
+        try:
+            await self._ensure_reader()
+        except Exception:
+            self.unregister(submission_id, queue)
+            raise
+        return queue
+
+    def unregister(self, submission_id: str, queue: asyncio.Queue):
+        queues = self._subs.get(submission_id)
+        if not queues:
+            return
+        try:
+            queues.remove(queue)
+        except ValueError:
+            pass
+        if not queues:
+            del self._subs[submission_id]
+
+    async def close(self):
+        self._fail_all(ConnectionError("events hub closed"))
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            # Reader was cancelled before it started; release here instead
+            await self._release(self._pubsub)
+        self._subs.clear()
+
+
+async def get_hub() -> EventsHub:
+    """Get the per-process events hub, creating it on first use."""
+    global _hub
+    if _hub is None:
+        _hub = EventsHub(await get_events_redis())
+    return _hub
+
+
 async def publish_status(submission_id: str, status: str, payload: Optional[dict] = None):
     """
     Publish a status change event for a submission.
@@ -55,44 +221,55 @@ async def publish_status(submission_id: str, status: str, payload: Optional[dict
         message = {"status": status}
         if payload:
             message.update(payload)
-        
-        await r.publish(channel, json.dumps(message))
+
+        await r.publish(channel, orjson.dumps(message))
         logger.info(f"event_published submission_id={submission_id} status={status}")
     except Exception as e:
         logger.error(f"event_publish_failed submission_id={submission_id} error={str(e)}")
 
 
+def queue_completed(
+    pipe,
+    submission_id: str,
+    review_id: str,
+    payload: Optional[dict] = None,
+    code_hash: Optional[str] = None,
+    ttl: Optional[int] = None,
+):
+    """Queue the review-ID cache SET and 'completed' PUBLISH on a pipeline."""
+    message = {"status": "completed", "review_id": review_id}
+    if payload:
+        message.update(payload)
+    if code_hash:
+        key = review_cache_key(code_hash)
+        pipe.set(key, review_id, ex=ttl or int(settings.CACHE_TTL_SECONDS))
+        # Safe to record before execute: the review already exists in Mongo
+        remember_review_id(key, review_id)
+    pipe.publish(_channel_name(submission_id), orjson.dumps(message))
+
+
 async def subscribe_status(submission_id: str) -> AsyncGenerator[dict, None]:
     """
     Subscribe to status change events for a submission.
-    
+
+    Events are delivered through the shared per-process hub; the caller's
+    queue is removed when the generator is closed.
+
     Yields:
         dict: Event data with 'status' and optional additional fields
     """
-    r = await get_events_redis()
-    channel = _channel_name(submission_id)
-    pubsub = r.pubsub()
-    
+    hub = await get_hub()
+    queue = await hub.register(submission_id)
+    logger.info(f"event_subscribed submission_id={submission_id}")
+
     try:
-        await pubsub.subscribe(channel)
-        logger.info(f"event_subscribed submission_id={submission_id} channel={channel}")
-        
         while True:
-            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if message is None:
-                continue
-            
-            if message["type"] == "message":
-                try:
-                    data = json.loads(message["data"])
-                    yield data
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.error(f"event_parse_error submission_id={submission_id} error={str(e)}")
-                    continue
+            item = await queue.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
     except Exception as e:
         logger.error(f"event_subscribe_error submission_id={submission_id} error={str(e)}")
         raise
     finally:
-        await pubsub.unsubscribe(channel)
-        await pubsub.close()
-
+        hub.unregister(submission_id, queue)
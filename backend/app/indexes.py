@@ -12,6 +12,23 @@ async def ensure_indexes(db):
         IndexModel(
             [("ip", ASCENDING), ("created_at", DESCENDING)], name="sub_ip_created"
         ),
+        IndexModel(
+            [
+                ("created_at", DESCENDING),
+                ("language", ASCENDING),
+                ("status", ASCENDING),
+            ],
+            name="sub_created_lang_status",
+        ),
+        IndexModel(
+            [
+                ("language", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("score", DESCENDING),
+            ],
+            name="sub_lang_status_created_score",
+        ),
     ]
 
     rev_indexes = [
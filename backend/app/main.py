@@ -9,6 +9,7 @@ from .db import init_db, close_db
 from .cache import init_cache, close_cache
 from .rate_limit import init_rate_limiter, close_rate_limiter
 from .events import init_events, close_events
+from .redis_pool import close_pools
 
 
 def origin_from_url(url: str) -> str:
@@ -28,6 +29,7 @@ async def lifespan(app: FastAPI):
         await close_events()
         await close_rate_limiter()
         await close_cache()
+        await close_pools()
         await close_db()
 
 
@@ -45,7 +47,12 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["Location"],
+    expose_headers=[
+        "Location",
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+    ],
 )
 app.include_router(health.router)
 app.include_router(reviews.router)
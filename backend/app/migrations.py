@@ -0,0 +1,115 @@
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = {
+    "submissions": ("created_at", "updated_at"),
+    "reviews": ("created_at",),
+}
+
+
+async def migrate_string_dates(db):
+    """
+    Convert ISO-string timestamps written by older releases to BSON dates.
+
+    Only string values are touched, so this is a no-op once a collection has
+    been converted. Unparseable strings are left as they are rather than
+    failing the whole update.
+    """
+    for coll, fields in DATE_FIELDS.items():
+        for field in fields:
+            res = await db[coll].update_many(
+                {field: {"$type": "string"}},
+                [
+                    {
+                        "$set": {
+                            field: {
+                                "$convert": {
+                                    "input": f"${field}",
+                                    "to": "date",
+                                    "onError": f"${field}",
+                                }
+                            }
+                        }
+                    }
+                ],
+            )
+            if res.modified_count:
+                logger.info(
+                    f"migration_string_dates collection={coll} field={field} converted={res.modified_count}"
+                )
+
+
+async def backfill_review_summary(db):
+    """
+    Copy the review summary onto completed submissions that predate it.
+
+    Listings filter and render from submissions alone, so rows missing the
+    denormalized fields would drop out of score filters. Joins each such
+    submission to its review and merges the fields back in place.
+    """
+    from .db import REVIEW_SUMMARY_FIELDS
+
+    summary = {"score": "$review.score"}
+    for field in REVIEW_SUMMARY_FIELDS[1:]:
+        summary[field] = {"$ifNull": [f"$review.{field}", []]}
+    summary["issues_count"] = {"$size": {"$ifNull": ["$review.issues", []]}}
+
+    await db["submissions"].aggregate(
+        [
+            {"$match": {"review_id": {"$ne": None}, "score": {"$exists": False}}},
+            {
+                "$lookup": {
+                    "from": "reviews",
+                    "localField": "review_id",
+                    "foreignField": "_id",
+                    "as": "review",
+                }
+            },
+            {"$unwind": "$review"},
+            {"$project": summary},
+            {
+                "$merge": {
+                    "into": "submissions",
+                    "on": "_id",
+                    "whenMatched": "merge",
+                    "whenNotMatched": "discard",
+                }
+            },
+        ]
+    ).to_list(length=None)
+
+
+# Applied in order; each name is recorded in MIGRATIONS_COLLECTION once it
+# succeeds, so later startups skip it instead of rescanning the collections
+MIGRATIONS = (migrate_string_dates, backfill_review_summary)
+MIGRATIONS_COLLECTION = "migrations"
+
+
+async def run_migrations(db):
+    """
+    Run data migrations that have not been recorded as applied.
+
+    Reads tolerate unmigrated rows, so a failing migration is logged and
+    left unrecorded to be retried on the next start instead of keeping the
+    API down.
+    """
+    applied = db[MIGRATIONS_COLLECTION]
+    done = {doc["_id"] async for doc in applied.find({}, {"_id": 1})}
+    for migration in MIGRATIONS:
+        name = migration.__name__
+        if name in done:
+            continue
+        try:
+            await migration(db)
+        except Exception as e:
+            logger.error(f"migration_failed name={name} error={str(e)}")
+            continue
+        # Upsert: replicas starting together may both get here
+        await applied.update_one(
+            {"_id": name},
+            {"$setOnInsert": {"applied_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        logger.info(f"migration_applied name={name}")
@@ -1,7 +1,12 @@
-from typing import Optional
-from redis.asyncio import Redis, from_url
+from typing import Optional, Tuple
+from functools import lru_cache
+from uuid import uuid4
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 from fastapi import Request
 from .config import settings
+from .redis_pool import get_pool
+import math
 import time
 import ipaddress
 import logging
@@ -9,12 +14,38 @@ import logging
 logger = logging.getLogger(__name__)
 
 _rate: Optional[Redis] = None
+_sha: Optional[str] = None
+
+WINDOW_MS = 3600_000
+
+# Sliding-window limiter over a sorted set of request timestamps.
+# KEYS[1] = ratelimit:{ip}
+# ARGV = now_ms, window_ms, limit, member
+# Returns {allowed, count, oldest_ts}
+LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window + 60000)
+    count = count + 1
+    allowed = 1
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return {allowed, count, tonumber(oldest[2]) or now}
+"""
 
 
 async def init_rate_limiter(url: Optional[str] = None):
-    global _rate
+    global _rate, _sha
     if _rate is None:
-        _rate = from_url(url or settings.RATE_LIMIT_REDIS_URL, decode_responses=True)
+        _rate = Redis(connection_pool=get_pool(url or settings.RATE_LIMIT_REDIS_URL))
+        _sha = await _rate.script_load(LUA)
     return _rate
 
 
@@ -27,10 +58,21 @@ async def get_rate_redis() -> Redis:
 
 
 async def close_rate_limiter():
-    global _rate
+    global _rate, _sha
     if _rate is not None:
         await _rate.aclose()
         _rate = None
+        _sha = None
+
+
+@lru_cache(maxsize=4096)
+def _is_public(ip_str: str) -> bool:
+    """True for a parseable, non-private/loopback/link-local address."""
+    try:
+        ip = ipaddress.ip_address(ip_str)
+    except ValueError:
+        return False
+    return not (ip.is_private or ip.is_loopback or ip.is_link_local)
 
 
 def extract_client_ip(request: Request) -> str:
@@ -46,22 +88,21 @@ def extract_client_ip(request: Request) -> str:
     if settings.TRUSTED_PROXY_HEADERS:
         xff = request.headers.get("X-Forwarded-For")
         if xff:
+            # Common case: a single address, no list to split
+            if "," not in xff:
+                ip_str = xff.strip()
+                logger.debug(f"extracted_ip_from_xff ip={ip_str}")
+                return ip_str
             # X-Forwarded-For can contain multiple IPs: "client, proxy1, proxy2"
             # Take the first public IP in the list
             ips = [ip.strip() for ip in xff.split(",")]
             for ip_str in ips:
-                try:
-                    ip = ipaddress.ip_address(ip_str)
-                    # Return first public IP (not private/localhost)
-                    if not ip.is_private and not ip.is_loopback and not ip.is_link_local:
-                        logger.debug(f"extracted_ip_from_xff ip={ip_str}")
-                        return ip_str
-                except ValueError:
-                    continue
+                if _is_public(ip_str):
+                    logger.debug(f"extracted_ip_from_xff ip={ip_str}")
+                    return ip_str
             # If no public IP found, use first one anyway (fallback)
-            if ips:
-                logger.debug(f"using_first_xff_ip ip={ips[0]}")
-                return ips[0]
+            logger.debug(f"using_first_xff_ip ip={ips[0]}")
+            return ips[0]
     
     # Default: use direct client host
     ip = request.client.host if request.client else "unknown"
@@ -69,19 +110,56 @@ def extract_client_ip(request: Request) -> str:
     return ip
 
 
-async def limit_check(ip: str, per_hour: Optional[int] = None):
+async def _eval_window(r: Redis, key: str, now_ms: int, limit: int) -> list:
+    global _sha
+    args = (key, now_ms, WINDOW_MS, limit, uuid4().hex)
+    if _sha is not None:
+        try:
+            return await r.evalsha(_sha, 1, *args)
+        except NoScriptError:
+            # Script cache was flushed (restart/SCRIPT FLUSH); reload lazily
+            _sha = None
+    res = await r.eval(LUA, 1, *args)
+    _sha = await r.script_load(LUA)
+    return res
+
+
+async def limit_check(ip: str, per_hour: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    Record a request for ``ip`` and enforce the rolling-hour limit.
+
+    Returns:
+        (limit, remaining, retry_after) where retry_after is the number of
+        seconds until the oldest request in the window expires
+
+    Raises:
+        HTTPException: 429 with Retry-After and X-RateLimit-* headers
+    """
     r = await get_rate_redis()
     limit = per_hour or int(settings.RATE_LIMIT_PER_HOUR)
-    bucket = int(time.time() // 3600)
-    key = f"ratelimit:{ip}:{bucket}"
-    cnt = await r.incr(key)
-    if cnt == 1:
-        await r.expire(key, 3600)
-    if cnt > limit:
-        logger.warning(f"rate_limit_exceeded ip={ip} count={cnt} limit={limit}")
+    key = f"ratelimit:{ip}"
+    now_ms = int(time.time() * 1000)
+    allowed, cnt, oldest_ts = await _eval_window(r, key, now_ms, limit)
+    retry_after = max(1, math.ceil((int(oldest_ts) + WINDOW_MS - now_ms) / 1000))
+    remaining = max(0, limit - cnt)
+    if not allowed:
+        logger.warning(
+            f"rate_limit_exceeded ip={ip} count={cnt} limit={limit} retry_after={retry_after}"
+        )
         from fastapi import HTTPException
 
         raise HTTPException(
-            status_code=429, detail=f"Rate limit exceeded ({limit} reviews/hour)"
+            status_code=429,
+            detail={
+                "ok": False,
+                "code": "agent.rate_limited",
+                "message": f"Rate limit exceeded ({limit} reviews/hour)",
+            },
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+            },
         )
     logger.debug(f"rate_limit_check ip={ip} count={cnt} limit={limit}")
+    return limit, remaining, retry_after
@@ -0,0 +1,31 @@
+from typing import Dict, Optional
+from redis.asyncio import BlockingConnectionPool
+from .config import settings
+
+# One pool per Redis URL; cache and events share CACHE_REDIS_URL, the rate
+# limiter gets its own pool unless it is pointed at the same URL.
+_pools: Dict[str, BlockingConnectionPool] = {}
+
+
+def get_pool(url: Optional[str] = None) -> BlockingConnectionPool:
+    """Get the shared connection pool for a Redis URL, creating it on first use."""
+    url = url or settings.CACHE_REDIS_URL
+    pool = _pools.get(url)
+    if pool is None:
+        pool = BlockingConnectionPool.from_url(
+            url,
+            max_connections=int(settings.REDIS_POOL_SIZE),
+            decode_responses=True,
+            health_check_interval=30,
+            socket_keepalive=True,
+        )
+        _pools[url] = pool
+    return pool
+
+
+async def close_pools():
+    """Disconnect and drop all shared pools."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        await pool.disconnect()
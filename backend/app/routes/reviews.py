@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Request, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response, status
 from datetime import datetime
 from bson import ObjectId
 from typing import Optional
 import asyncio
-import json
+import orjson
 import logging
 
 from sse_starlette.sse import EventSourceResponse
@@ -20,21 +20,27 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/reviews", tags=["reviews"])
 
 
-async def get_reviews_for_submission(id: str) -> ReviewOut:
-    submission = await db.submissions.find_one({"_id": ObjectId(id)})
-    if not submission:
-        raise ValueError("Not found")
+def _parse_oid(id: str) -> Optional[ObjectId]:
+    return ObjectId(id) if ObjectId.is_valid(id) else None
+
+
+def oid_dep(id: str) -> ObjectId:
+    """Path dependency: parse ``id`` once, 400 on malformed ObjectIds."""
+    oid = _parse_oid(id)
+    if oid is None:
+        raise HTTPException(status_code=400, detail="invalid_id")
+    return oid
 
+
+def _to_reviewout(submission: dict, review: Optional[dict]) -> ReviewOut:
     score = issues = security = performance = suggestions = None
 
-    if submission.get("review_id"):
-        review = await db.reviews.find_one({"_id": submission["review_id"]})
-        if review:
-            score = review.get("score")
-            issues = review.get("issues", [])
-            security = review.get("security", [])
-            performance = review.get("performance", [])
-            suggestions = review.get("suggestions", [])
+    if review:
+        score = review.get("score")
+        issues = review.get("issues", [])
+        security = review.get("security", [])
+        performance = review.get("performance", [])
+        suggestions = review.get("suggestions", [])
 
     return ReviewOut(
         id=str(submission["_id"]),
@@ -51,16 +57,58 @@ async def get_reviews_for_submission(id: str) -> ReviewOut:
     )
 
 
+def _row_to_reviewout(sub: dict, legacy_reviews: Optional[dict] = None) -> ReviewOut:
+    """
+    Build a ReviewOut from a submission carrying its denormalized review fields.
+
+    Rows completed before the fields were denormalized (and not yet
+    backfilled) have a review_id but no score; their review is taken from
+    ``legacy_reviews``, keyed by review ID, instead.
+    """
+    review_id = sub.get("review_id")
+    if review_id and "score" not in sub and legacy_reviews is not None:
+        return _to_reviewout(sub, legacy_reviews.get(review_id))
+    return _to_reviewout(sub, sub if review_id else None)
+
+
+async def get_reviews_for_submission(oid: ObjectId) -> ReviewOut:
+    submission = await db.submissions.find_one({"_id": oid})
+    if not submission:
+        raise ValueError("Not found")
+
+    review = None
+    if submission.get("review_id"):
+        review = await db.reviews.find_one({"_id": submission["review_id"]})
+
+    return _to_reviewout(submission, review)
+
+
+async def _fetch_review(review_id: ObjectId) -> Optional[dict]:
+    """Load a review document with its ObjectIds stringified for JSON."""
+    review = await db.reviews.find_one({"_id": review_id})
+    if review:
+        review["_id"] = str(review["_id"])
+        if "submission_id" in review:
+            review["submission_id"] = str(review["submission_id"])
+    return review
+
+
 @router.post("", response_model=ReviewAccepted, status_code=status.HTTP_202_ACCEPTED)
 async def submit_review(payload: ReviewCreate, request: Request, response: Response):
     ip = extract_client_ip(request)
-    await limit_check(ip)
+    limit, remaining, _ = await limit_check(ip)
+    response.headers["X-RateLimit-Limit"] = str(limit)
+    response.headers["X-RateLimit-Remaining"] = str(remaining)
 
-    now = datetime.utcnow().isoformat()
+    now = datetime.utcnow()
     code_hash = compute_hash(payload.language, payload.code)
 
     cached_review_id = await cache_get_review_id(code_hash)
     if cached_review_id:
+        review = await db.reviews.find_one(
+            {"_id": ObjectId(cached_review_id)},
+            {f: 1 for f in db.REVIEW_SUMMARY_FIELDS},
+        )
         doc = {
             "code": payload.code,
             "language": payload.language,
@@ -71,6 +119,7 @@ async def submit_review(payload: ReviewCreate, request: Request, response: Respo
             "review_id": ObjectId(cached_review_id),
             "error": None,
             "code_hash": code_hash,
+            **db.review_summary(review or {}),
         }
         res = await db.submissions.insert_one(doc)
         submission_id = str(res.inserted_id)
@@ -100,8 +149,8 @@ async def submit_review(payload: ReviewCreate, request: Request, response: Respo
 
 
 @router.get("/{id}", response_model=ReviewOut)
-async def get_review(id: str):
-    return await get_reviews_for_submission(id)
+async def get_review(oid: ObjectId = Depends(oid_dep)):
+    return await get_reviews_for_submission(oid)
 
 
 @router.get("", response_model=PaginatedReviewsOut)
@@ -110,73 +159,57 @@ async def list_reviews(
     status: Optional[str] = None,
     min_score: Optional[int] = Query(None, ge=1, le=10),
     max_score: Optional[int] = Query(None, ge=1, le=10),
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     page: int = 1,
     page_size: int = 20,
 ):
-    # Build match stage for submissions
-    match_stage = {}
+    # Score is denormalized onto submissions at completion, so the whole
+    # filter runs against one collection and its compound index
+    query = {}
     if language:
-        match_stage["language"] = language
+        query["language"] = language
     if status:
-        match_stage["status"] = status
+        query["status"] = status
     if start_date or end_date:
         created = {}
         if start_date:
             created["$gte"] = start_date
         if end_date:
             created["$lte"] = end_date
-        match_stage["created_at"] = created
-
-    # Build aggregation pipeline with lookup
-    pipeline = [
-        {"$match": match_stage},
-        {
-            "$lookup": {
-                "from": "reviews",
-                "localField": "review_id",
-                "foreignField": "_id",
-                "as": "review"
-            }
-        },
-        {"$unwind": {"path": "$review", "preserveNullAndEmptyArrays": True}},
-    ]
-
-    # Filter by score if specified (in DB, not memory)
+        query["created_at"] = created
     if min_score is not None or max_score is not None:
         score_match = {}
         if min_score is not None:
             score_match["$gte"] = min_score
         if max_score is not None:
             score_match["$lte"] = max_score
-        # Only match submissions that have reviews with scores in range
-        pipeline.append({
-            "$match": {
-                "review.score": score_match
-            }
-        })
-
-    # Count total before pagination
-    count_pipeline = pipeline + [{"$count": "total"}]
-    count_result = await db.submissions.aggregate(count_pipeline).to_list(length=1)
-    total = count_result[0]["total"] if count_result else 0
-
-    # Add sort and pagination
-    pipeline.extend([
-        {"$sort": {"created_at": -1}},
-        {"$skip": (page - 1) * page_size},
-        {"$limit": page_size},
-    ])
-
-    # Execute aggregation
-    submissions = await db.submissions.aggregate(pipeline).to_list(length=page_size)
-
-    # Convert to ReviewOut format
-    reviews = [
-        await get_reviews_for_submission(str(sub["_id"]))
+        query["score"] = score_match
+
+    cursor = (
+        db.submissions.find(query, {"code": 0, "ip": 0, "code_hash": 0})
+        .sort("created_at", -1)
+        .skip((page - 1) * page_size)
+        .limit(page_size)
+    )
+    total, submissions = await asyncio.gather(
+        db.submissions.count_documents(query),
+        cursor.to_list(length=page_size),
+    )
+
+    legacy_ids = [
+        sub["review_id"]
         for sub in submissions
+        if sub.get("review_id") and "score" not in sub
     ]
+    legacy_reviews = None
+    if legacy_ids:
+        legacy_reviews = {
+            rv["_id"]: rv
+            async for rv in db.reviews.find({"_id": {"$in": legacy_ids}})
+        }
+
+    reviews = [_row_to_reviewout(sub, legacy_reviews) for sub in submissions]
 
     return PaginatedReviewsOut(
         items=reviews,
@@ -192,10 +225,12 @@ async def stream_review(
     interval_ms: int = Query(1000, ge=10, le=60000),
     ping: int = Query(15000, ge=0, le=60000),
 ):
+    # Validated up front but reported in-stream, since EventSource can't read
+    # a 400 body
+    oid = _parse_oid(id)
+
     async def event_gen():
-        try:
-            oid = ObjectId(id)
-        except Exception:
+        if oid is None:
             yield {"event": "error", "data": "invalid_id"}
             return
 
@@ -212,13 +247,8 @@ async def stream_review(
         if status_val in ("completed", "failed"):
             payload = {"status": status_val}
             if sub.get("review_id"):
-                review = await db.reviews.find_one({"_id": sub["review_id"]})
-                if review:
-                    review["_id"] = str(review["_id"])
-                    if "submission_id" in review:
-                        review["submission_id"] = str(review["submission_id"])
-                payload["review"] = review
-            yield {"event": "done", "data": json.dumps(payload)}
+                payload["review"] = await _fetch_review(sub["review_id"])
+            yield {"event": "done", "data": orjson.dumps(payload).decode()}
             return
 
         # Subscribe to events and stream updates
@@ -230,18 +260,21 @@ async def stream_review(
 
                 # If terminal status, fetch full review and send done
                 if event_status in ("completed", "failed"):
-                    # Re-fetch submission to get latest review_id
-                    sub = await db.submissions.find_one({"_id": oid})
-                    if sub:
-                        payload = {"status": event_status}
-                        if sub.get("review_id"):
-                            review = await db.reviews.find_one({"_id": sub["review_id"]})
-                            if review:
-                                review["_id"] = str(review["_id"])
-                                if "submission_id" in review:
-                                    review["submission_id"] = str(review["submission_id"])
-                            payload["review"] = review
-                        yield {"event": "done", "data": json.dumps(payload)}
+                    if event_data.get("done_data"):
+                        # Worker embeds the finished review and the hub has
+                        # already encoded it; no Mongo read or dumps per subscriber
+                        yield {"event": "done", "data": event_data["done_data"]}
+                        return
+                    payload = {"status": event_status}
+                    review_id = event_data.get("review_id")
+                    if review_id:
+                        # Event already carries review_id; no need to re-read the submission
+                        payload["review"] = await _fetch_review(ObjectId(review_id))
+                    elif event_status == "completed":
+                        sub = await db.submissions.find_one({"_id": oid})
+                        if sub and sub.get("review_id"):
+                            payload["review"] = await _fetch_review(sub["review_id"])
+                    yield {"event": "done", "data": orjson.dumps(payload).decode()}
                     return
         except Exception as e:
             logger.error(f"sse_subscribe_error submission_id={id} error={str(e)}")
@@ -259,13 +292,8 @@ async def stream_review(
                 if status_val in ("completed", "failed"):
                     payload = {"status": status_val}
                     if sub.get("review_id"):
-                        review = await db.reviews.find_one({"_id": sub["review_id"]})
-                        if review:
-                            review["_id"] = str(review["_id"])
-                            if "submission_id" in review:
-                                review["submission_id"] = str(review["submission_id"])
-                        payload["review"] = review
-                    yield {"event": "done", "data": json.dumps(payload)}
+                        payload["review"] = await _fetch_review(sub["review_id"])
+                    yield {"event": "done", "data": orjson.dumps(payload).decode()}
                     return
 
     return EventSourceResponse(
@@ -74,6 +74,15 @@ async def _isolate_env_and_counters():
     except Exception:
         pass
     cache._redis = None
+    cache._local.clear()
+    cache._local_miss.clear()
+
+    try:
+        if getattr(events, "_hub", None) is not None:
+            await events._hub.close()
+    except Exception:
+        pass
+    events._hub = None
 
     try:
         if getattr(events, "_redis", None) is not None:
@@ -82,6 +91,14 @@ async def _isolate_env_and_counters():
         pass
     events._redis = None
 
+    import app.redis_pool as redis_pool
+
+    try:
+        await redis_pool.close_pools()
+    except Exception:
+        pass
+    redis_pool._pools.clear()
+
     yield
 
 
@@ -98,11 +115,13 @@ def run_worker():
     async def _go(submission_id: str):
         from worker import _run as worker_run
         from app.cache import init_cache, close_cache
+        from app.batching import close_batcher
 
         await init_cache()
         try:
             await worker_run(submission_id)
         finally:
+            await close_batcher()
             await close_cache()
 
     return _go
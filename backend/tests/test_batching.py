@@ -0,0 +1,187 @@
+import asyncio
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app import db as dbmod
+from app.batching import CompletionBatcher
+from app.cache import review_cache_key
+from app.events import get_events_redis
+
+
+class _RecordingSubmissions:
+    """Wraps the submissions collection, recording bulk_write batch sizes."""
+
+    def __init__(self, inner, reject=(), error=None, gate=None):
+        self._inner = inner
+        self._reject = set(reject)
+        self._error = error
+        self._gate = gate
+        self.sizes = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.sizes.append(len(ops))
+        if self._gate is not None:
+            await self._gate.wait()
+        if self._error is not None:
+            raise self._error
+        applied = [op for i, op in enumerate(ops) if i not in self._reject]
+        if applied:
+            await self._inner.bulk_write(applied, ordered=ordered)
+        if self._reject:
+            raise BulkWriteError(
+                {
+                    "writeErrors": [
+                        {"index": i, "code": 121, "errmsg": "validation failed"}
+                        for i in sorted(self._reject)
+                    ],
+                    "writeConcernErrors": [],
+                    "nModified": len(applied),
+                }
+            )
+
+
+async def _pending(n):
+    now = datetime.utcnow()
+    oids = [ObjectId() for _ in range(n)]
+    await dbmod.submissions.insert_many(
+        [
+            {
+                "_id": oid,
+                "code": f"print({i})",
+                "language": "python",
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now,
+                "review_id": None,
+            }
+            for i, oid in enumerate(oids)
+        ]
+    )
+    return oids
+
+
+def _submit(batcher, oid, i):
+    return batcher.submit(
+        oid,
+        {"status": "completed", "review_id": f"r{i}"},
+        f"r{i}",
+        code_hash=f"hash{i}",
+    )
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    def _install(**kw):
+        rec = _RecordingSubmissions(dbmod.submissions, **kw)
+        monkeypatch.setattr(dbmod, "submissions", rec)
+        return rec
+
+    return _install
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_flush(recorder):
+    oids = await _pending(3)
+    inner = dbmod.submissions
+    rec = recorder()
+    batcher = CompletionBatcher(max_wait=0.05)
+
+    await asyncio.gather(*(_submit(batcher, oid, i) for i, oid in enumerate(oids)))
+
+    assert rec.sizes == [3]
+    r = await get_events_redis()
+    for i, oid in enumerate(oids):
+        sub = await inner.find_one({"_id": oid})
+        assert sub["status"] == "completed"
+        assert await r.get(review_cache_key(f"hash{i}")) == f"r{i}"
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_max_batch_splits_flushes(recorder):
+    oids = await _pending(5)
+    rec = recorder()
+    batcher = CompletionBatcher(max_batch=2, max_wait=0.05)
+
+    await asyncio.gather(*(_submit(batcher, oid, i) for i, oid in enumerate(oids)))
+
+    assert rec.sizes == [2, 2, 1]
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_error_fails_only_rejected_ops(recorder):
+    oids = await _pending(3)
+    inner = dbmod.submissions
+    recorder(reject={1})
+    batcher = CompletionBatcher(max_wait=0.05)
+
+    results = await asyncio.gather(
+        *(_submit(batcher, oid, i) for i, oid in enumerate(oids)),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], BulkWriteError)
+    r = await get_events_redis()
+    assert await r.get(review_cache_key("hash0")) == "r0"
+    assert await r.get(review_cache_key("hash1")) is None
+    assert await r.get(review_cache_key("hash2")) == "r2"
+    assert (await inner.find_one({"_id": oids[1]}))["status"] == "pending"
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_mongo_failure_fails_whole_batch(recorder):
+    oids = await _pending(2)
+    recorder(error=ConnectionError("mongo down"))
+    batcher = CompletionBatcher(max_wait=0.05)
+
+    results = await asyncio.gather(
+        *(_submit(batcher, oid, i) for i, oid in enumerate(oids)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(res, ConnectionError) for res in results)
+    r = await get_events_redis()
+    assert await r.get(review_cache_key("hash0")) is None
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_close_fails_queued_futures():
+    oids = await _pending(2)
+    batcher = CompletionBatcher(max_wait=10)
+
+    tasks = [asyncio.ensure_future(_submit(batcher, oid, i)) for i, oid in enumerate(oids)]
+    while batcher._queue.qsize() != 1:
+        # Flusher holds the first item in its wait window, the second is queued
+        await asyncio.sleep(0.01)
+    await batcher.close()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(res, RuntimeError) for res in results)
+    for oid in oids:
+        assert (await dbmod.submissions.find_one({"_id": oid}))["status"] == "pending"
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_inflight_batch(recorder):
+    (oid,) = await _pending(1)
+    inner = dbmod.submissions
+    gate = asyncio.Event()
+    rec = recorder(gate=gate)
+    batcher = CompletionBatcher(max_wait=0)
+
+    task = asyncio.ensure_future(_submit(batcher, oid, 0))
+    while not rec.sizes:
+        await asyncio.sleep(0.01)
+    closing = asyncio.ensure_future(batcher.close())
+    await asyncio.sleep(0.05)
+    assert not closing.done()
+    gate.set()
+    await closing
+
+    assert await task is None
+    assert (await inner.find_one({"_id": oid}))["status"] == "completed"
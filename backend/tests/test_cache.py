@@ -1,6 +1,16 @@
 import pytest
+from blake3 import blake3
 from bson import ObjectId
+from app import cache
 from app import db as dbmod
+from app.cache import code_hash, cache_get_review_id, remember_review_id, review_cache_key
+
+
+def test_code_hash_matches_normalized_form():
+    code = "\n  def f():  \n\treturn 1\t\n\n"
+    expected = blake3("python\ndef f():\n\treturn 1".encode("utf-8")).hexdigest()
+    assert code_hash(" Python ", code) == expected
+    assert code_hash("python", "") == blake3(b"python\n").hexdigest()
 
 
 @pytest.mark.asyncio
@@ -26,3 +36,39 @@ async def test_cache_hit_returns_completed(client, run_worker):
 
     sub2 = await dbmod.submissions.find_one({"_id": ObjectId(rid2)})
     assert sub2 and sub2.get("review_id")
+
+
+@pytest.fixture
+def redis_calls(monkeypatch):
+    """Count Redis GETs made by cache_get_review_id."""
+    calls = []
+    real_get_cache = cache.get_cache
+
+    async def counting_get_cache():
+        calls.append(1)
+        return await real_get_cache()
+
+    monkeypatch.setattr(cache, "get_cache", counting_get_cache)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_local_hit_skips_redis(redis_calls):
+    remember_review_id(review_cache_key("abc"), "rid-1")
+    assert await cache_get_review_id("abc") == "rid-1"
+    assert redis_calls == []
+
+
+@pytest.mark.asyncio
+async def test_miss_is_cached_locally(redis_calls):
+    assert await cache_get_review_id("missing") is None
+    assert await cache_get_review_id("missing") is None
+    assert len(redis_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_remember_review_id_clears_cached_miss(redis_calls):
+    assert await cache_get_review_id("late") is None
+    remember_review_id(review_cache_key("late"), "rid-2")
+    assert await cache_get_review_id("late") == "rid-2"
+    assert len(redis_calls) == 1
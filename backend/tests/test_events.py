@@ -0,0 +1,197 @@
+import asyncio
+import orjson
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from app import db as dbmod
+from app import events
+
+
+async def _next(agen, timeout=2.0):
+    return await asyncio.wait_for(agen.__anext__(), timeout)
+
+
+class _FakePubSub:
+    """Stand-in PubSub whose listen() replays messages, then ends or raises."""
+
+    def __init__(self, messages, exc=None, hold=False):
+        self._messages = messages
+        self._exc = exc
+        self._hold = hold
+        self.closed = False
+        self.drained = asyncio.Event()
+
+    async def psubscribe(self, *_):
+        pass
+
+    async def punsubscribe(self, *_):
+        pass
+
+    async def aclose(self):
+        self.closed = True
+
+    async def listen(self):
+        for m in self._messages:
+            yield m
+        self.drained.set()
+        if self._hold:
+            # Stay connected, like an idle Redis subscription
+            await asyncio.Event().wait()
+        if self._exc is not None:
+            raise self._exc
+
+
+class _FakeRedis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def pubsub(self, **_):
+        return self._pubsub
+
+
+def _msg(submission_id, data):
+    return {
+        "type": "pmessage",
+        "pattern": events.CHANNEL_PATTERN,
+        "channel": f"submission:{submission_id}:status",
+        "data": data,
+    }
+
+
+@pytest.mark.asyncio
+async def test_hub_demuxes_by_submission():
+    a1 = events.subscribe_status("aaa")
+    a2 = events.subscribe_status("aaa")
+    b = events.subscribe_status("bbb")
+    try:
+        first = [asyncio.ensure_future(_next(g)) for g in (a1, a2, b)]
+        hub = await events.get_hub()
+        while len(hub._subs.get("aaa", ())) < 2 or "bbb" not in hub._subs:
+            await asyncio.sleep(0.01)
+
+        await events.publish_status("aaa", "in_progress")
+        await events.publish_status("bbb", "failed", {"error": "boom"})
+
+        got_a1, got_a2, got_b = await asyncio.gather(*first)
+        assert got_a1 == got_a2 == {"status": "in_progress"}
+        assert got_b == {"status": "failed", "error": "boom"}
+    finally:
+        for g in (a1, a2, b):
+            await g.aclose()
+        await events.close_events()
+
+
+@pytest.mark.asyncio
+async def test_closing_subscriber_unregisters():
+    gen = events.subscribe_status("ccc")
+    pending = asyncio.ensure_future(_next(gen))
+    hub = await events.get_hub()
+    while "ccc" not in hub._subs:
+        await asyncio.sleep(0.01)
+
+    await events.publish_status("ccc", "in_progress")
+    assert (await pending)["status"] == "in_progress"
+
+    await gen.aclose()
+    assert "ccc" not in hub._subs
+    await events.close_events()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_keeps_newest_events(monkeypatch):
+    monkeypatch.setattr(events.settings, "EVENTS_SUBSCRIBER_QUEUE_SIZE", 2)
+    sent = [
+        {"status": "pending"},
+        {"status": "in_progress"},
+        {"status": "in_progress", "progress": 50},
+        {"status": "completed", "review_id": "r1"},
+    ]
+    pubsub = _FakePubSub([_msg("fff", orjson.dumps(m)) for m in sent], hold=True)
+    hub = events.EventsHub(_FakeRedis(pubsub))
+    queue = await hub.register("fff")
+
+    # Nobody reads the queue while all four events are delivered
+    await asyncio.wait_for(pubsub.drained.wait(), 2)
+
+    assert queue.qsize() == 2
+    assert [queue.get_nowait(), queue.get_nowait()] == sent[-2:]
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_done_payload_encoded_once_for_all_subscribers():
+    review = {"id": "r1", "score": 8}
+    body = events.encode_done("completed", review)
+    event = {"status": "completed", "review_id": "r1", "review": review}
+    pubsub = _FakePubSub([_msg("eee", orjson.dumps(event))])
+    hub = events.EventsHub(_FakeRedis(pubsub))
+    q1 = await hub.register("eee")
+    q2 = await hub.register("eee")
+
+    got1 = await asyncio.wait_for(q1.get(), 2)
+    got2 = await asyncio.wait_for(q2.get(), 2)
+    assert got1["done_data"] == body
+    assert got1["done_data"] is got2["done_data"]
+    await hub.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exc", [None, RuntimeError("socket reset")])
+async def test_reader_exit_fails_subscribers(exc):
+    pubsub = _FakePubSub([_msg("ddd", '{"status": "in_progress"}')], exc=exc)
+    hub = events.EventsHub(_FakeRedis(pubsub))
+    queue = await hub.register("ddd")
+
+    assert await asyncio.wait_for(queue.get(), 2) == {"status": "in_progress"}
+    err = await asyncio.wait_for(queue.get(), 2)
+    assert isinstance(err, Exception)
+    await asyncio.wait_for(hub._reader, 2)
+    assert pubsub.closed
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_to_polling_when_pubsub_fails(client, monkeypatch):
+    from app.routes import reviews as reviews_route
+
+    async def broken_subscribe(_):
+        raise ConnectionError("redis down")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(reviews_route, "subscribe_status", broken_subscribe)
+
+    now = datetime.utcnow()
+    sub_id = ObjectId()
+    await dbmod.submissions.insert_one(
+        {
+            "_id": sub_id,
+            "code": "print('poll')",
+            "language": "python",
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+            "ip": "127.0.0.1",
+            "review_id": None,
+            "error": None,
+        }
+    )
+
+    async def finisher():
+        await asyncio.sleep(0.1)
+        await dbmod.submissions.update_one(
+            {"_id": sub_id}, {"$set": {"status": "failed", "error": "x"}}
+        )
+
+    fin_task = asyncio.create_task(finisher())
+    events_seen = []
+    async with client.stream(
+        "GET", f"/api/reviews/{sub_id}/stream?interval_ms=20&ping=0", timeout=3.0
+    ) as s:
+        async for line in s.aiter_lines():
+            if line.startswith("event:"):
+                events_seen.append(line.split(":", 1)[1].strip())
+                if events_seen[-1] == "done":
+                    break
+    await fin_task
+    assert events_seen[0] == "status"
+    assert events_seen[-1] == "done"
@@ -1,12 +1,13 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
 from app import db as dbmod
+from app.db import review_summary
 
 
 @pytest.mark.asyncio
 async def test_list_filters(client):
-    now = datetime.utcnow().isoformat()
+    now = datetime.utcnow()
     r1 = await dbmod.reviews.insert_one(
         {"submission_id": ObjectId(), "score": 9, "issues": [], "created_at": now}
     )
@@ -23,6 +24,7 @@ async def test_list_filters(client):
             "ip": "1.1.1.1",
             "review_id": r1.inserted_id,
             "error": None,
+            **review_summary({"score": 9, "issues": []}),
         }
     )
     await dbmod.submissions.insert_one(
@@ -35,6 +37,7 @@ async def test_list_filters(client):
             "ip": "1.1.1.1",
             "review_id": r2.inserted_id,
             "error": None,
+            **review_summary({"score": 4, "issues": []}),
         }
     )
 
@@ -54,3 +57,36 @@ async def test_list_filters(client):
     items = data["items"]
     assert all(it["language"] == "python" for it in items)
     assert all((it["score"] or 0) >= 5 for it in items)
+    assert any(it["score"] == 9 for it in items)
+
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    resp = await client.get("/api/reviews", params={"start_date": tomorrow})
+    assert resp.status_code == 200
+    assert resp.json()["total"] == 0
+
+
+@pytest.mark.asyncio
+async def test_list_renders_rows_without_denormalized_summary(client):
+    now = datetime.utcnow()
+    rv = await dbmod.reviews.insert_one(
+        {"submission_id": ObjectId(), "score": 6, "issues": [], "created_at": now}
+    )
+    # Completed before review fields were copied onto submissions
+    await dbmod.submissions.insert_one(
+        {
+            "code": "fn main() {}",
+            "language": "rust",
+            "status": "completed",
+            "created_at": now,
+            "updated_at": now,
+            "ip": "1.1.1.1",
+            "review_id": rv.inserted_id,
+            "error": None,
+        }
+    )
+
+    resp = await client.get("/api/reviews", params={"language": "rust"})
+    assert resp.status_code == 200
+    (item,) = resp.json()["items"]
+    assert item["score"] == 6
+    assert item["issues"] == []
@@ -12,3 +12,95 @@ async def test_rate_limit_hits_429(client):
 
     assert codes[:3] == [202, 202, 202]
     assert codes[3] == 429
+
+    assert int(r.headers["Retry-After"]) > 0
+    assert r.headers["X-RateLimit-Limit"] == "3"
+    assert r.headers["X-RateLimit-Remaining"] == "0"
+    detail = r.json()["detail"]
+    assert detail["ok"] is False
+    assert detail["code"] == "agent.rate_limited"
+
+
+def test_extract_client_ip_prefers_first_public_xff(monkeypatch):
+    from starlette.requests import Request
+    from app.config import settings
+    from app.rate_limit import extract_client_ip
+
+    def req(xff):
+        return Request(
+            {
+                "type": "http",
+                "headers": [(b"x-forwarded-for", xff.encode())],
+                "client": ("10.0.0.9", 1234),
+            }
+        )
+
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HEADERS", True)
+    assert extract_client_ip(req("10.0.0.1, 8.8.8.8, 1.1.1.1")) == "8.8.8.8"
+    assert extract_client_ip(req("10.0.0.1, junk")) == "10.0.0.1"
+    assert extract_client_ip(req(" 9.9.9.9 ")) == "9.9.9.9"
+
+
+@pytest.fixture
+async def limiter(monkeypatch):
+    from types import SimpleNamespace
+    import app.rate_limit as rl
+
+    clock = {"s": 1_700_000_000.0}
+    monkeypatch.setattr(rl, "time", SimpleNamespace(time=lambda: clock["s"]))
+    r = await rl.init_rate_limiter()
+    try:
+        yield rl, r, clock
+    finally:
+        await rl.close_rate_limiter()
+
+
+async def _status(rl, ip, limit):
+    from fastapi import HTTPException
+
+    try:
+        await rl.limit_check(ip, per_hour=limit)
+        return 202
+    except HTTPException as e:
+        return e.status_code
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_are_not_recorded(limiter):
+    rl, r, _ = limiter
+
+    assert [await _status(rl, "1.2.3.4", 2) for _ in range(5)] == [202, 202, 429, 429, 429]
+    assert await r.zcard("ratelimit:1.2.3.4") == 2
+
+
+@pytest.mark.asyncio
+async def test_slots_free_up_as_window_slides(limiter):
+    rl, _, clock = limiter
+    start = clock["s"]
+
+    assert await _status(rl, "1.2.3.4", 2) == 202
+    clock["s"] = start + 1800
+    assert await _status(rl, "1.2.3.4", 2) == 202
+    clock["s"] = start + 2400
+    assert await _status(rl, "1.2.3.4", 2) == 429
+
+    # First request ages out of the rolling hour; the second is still counted
+    clock["s"] = start + 3600 + 1
+    _, remaining, retry_after = await rl.limit_check("1.2.3.4", per_hour=2)
+    assert remaining == 0
+    assert retry_after == 1800 - 1
+    assert await _status(rl, "1.2.3.4", 2) == 429
+
+
+@pytest.mark.asyncio
+async def test_noscript_falls_back_to_eval_and_reloads(limiter):
+    rl, r, _ = limiter
+    sha = rl._sha
+    assert sha
+
+    await r.script_flush()
+    assert await _status(rl, "5.6.7.8", 2) == 202
+    assert rl._sha == sha
+    assert (await r.script_exists(sha)) == [True]
+    assert await _status(rl, "5.6.7.8", 2) == 202
+    assert await _status(rl, "5.6.7.8", 2) == 429
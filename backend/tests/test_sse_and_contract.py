@@ -18,7 +18,7 @@ async def test_post_returns_202_and_location(client):
 
 @pytest.mark.asyncio
 async def test_sse_immediate_done(client):
-    now = datetime.utcnow().isoformat()
+    now = datetime.utcnow()
     review_doc = {
         "submission_id": ObjectId(),
         "score": 8,
@@ -74,7 +74,7 @@ async def test_sse_immediate_done(client):
 
 @pytest.mark.asyncio
 async def test_sse_transition_to_done(client):
-    now = datetime.utcnow().isoformat()
+    now = datetime.utcnow()
     sub_id = ObjectId()
     await dbmod.submissions.insert_one(
         {
@@ -112,7 +112,7 @@ async def test_sse_transition_to_done(client):
                 "security": [],
                 "performance": [],
                 "suggestions": [],
-                "created_at": datetime.utcnow().isoformat(),
+                "created_at": datetime.utcnow(),
             }
         )
         await dbmod.submissions.update_one(
@@ -121,7 +121,7 @@ async def test_sse_transition_to_done(client):
                 "$set": {
                     "status": "completed",
                     "review_id": r_ins.inserted_id,
-                    "updated_at": datetime.utcnow().isoformat(),
+                    "updated_at": datetime.utcnow(),
                 }
             },
         )
@@ -158,6 +158,77 @@ async def test_sse_transition_to_done(client):
     assert any(s in ("pending", "in_progress", "completed") for s in statuses)
 
 
+@pytest.mark.asyncio
+async def test_sse_done_uses_embedded_review(client):
+    now = datetime.utcnow()
+    sub_id = ObjectId()
+    await dbmod.submissions.insert_one(
+        {
+            "_id": sub_id,
+            "code": "print('embedded')",
+            "language": "python",
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+            "ip": "127.0.0.1",
+            "review_id": None,
+            "error": None,
+        }
+    )
+    review_id = str(ObjectId())
+    review = {
+        "_id": review_id,
+        "submission_id": str(sub_id),
+        "score": 6,
+        "issues": [],
+        "security": [],
+        "performance": [],
+        "suggestions": [],
+        "created_at": now,
+    }
+
+    async def finisher():
+        await asyncio.sleep(0.1)
+        from app.batching import get_batcher
+
+        # No review document in Mongo: the done payload must come from the event
+        batcher = await get_batcher()
+        await batcher.submit(
+            sub_id,
+            {"status": "completed", "review_id": review_id},
+            review_id,
+            {"review": review},
+        )
+
+    fin_task = asyncio.create_task(finisher())
+
+    done = None
+    async with client.stream(
+        "GET",
+        f"/api/reviews/{sub_id}/stream?interval_ms=50&ping=0",
+        timeout=3.0,
+    ) as s:
+        event = None
+        data_lines = []
+        async for line in s.aiter_lines():
+            line = line.strip()
+            if not line:
+                if event == "done":
+                    done = json.loads("".join(data_lines))
+                    break
+                event, data_lines = None, []
+                continue
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line.split(":", 1)[1].strip())
+
+    await fin_task
+    assert done["status"] == "completed"
+    assert done["review"]["_id"] == review_id
+    assert done["review"]["score"] == 6
+
+
 @pytest.mark.asyncio
 async def test_sse_invalid_id_errors_immediately(client):
     async with client.stream(
@@ -170,3 +241,10 @@ async def test_sse_invalid_id_errors_immediately(client):
                 break
         frame = "\n".join(lines)
         assert "event: error" in frame and "data: invalid_id" in frame
+
+
+@pytest.mark.asyncio
+async def test_get_invalid_id_returns_400(client):
+    r = await client.get("/api/reviews/not-a-valid-id")
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_id"
@@ -6,7 +6,7 @@ from app import db as dbmod
 
 @pytest.mark.asyncio
 async def test_stats_calculation(client):
-    now = datetime.utcnow().isoformat()
+    now = datetime.utcnow()
     r1 = await dbmod.reviews.insert_one(
         {
             "submission_id": ObjectId(),
@@ -20,3 +20,44 @@ async def test_submit_then_worker_then_get_review(client, stub_ai_review, run_wo
     assert r2.status_code == 200
     review = r2.json()
     assert review["status"] in ("completed", "failed")
+
+
+def _loop_threads():
+    import threading
+
+    return [t for t in threading.enumerate() if t.name == "worker-asyncio" and t.is_alive()]
+
+
+def test_worker_loop_init_failure_does_not_leak_thread(monkeypatch):
+    import worker
+
+    async def broken_init_events():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(worker, "init_db_sync", lambda: None)
+    monkeypatch.setattr(worker, "close_db_sync", lambda: None)
+    monkeypatch.setattr(worker, "init_events", broken_init_events)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            worker._ensure_loop()
+        assert worker._LOOP is None
+        assert _loop_threads() == []
+
+
+def test_worker_loop_starts_once_and_shuts_down(monkeypatch):
+    import worker
+
+    monkeypatch.setattr(worker, "init_db_sync", lambda: None)
+    monkeypatch.setattr(worker, "close_db_sync", lambda: None)
+
+    loop = worker._ensure_loop()
+    try:
+        assert worker._ensure_loop() is loop
+        assert len(_loop_threads()) == 1
+    finally:
+        worker._on_worker_shutdown()
+
+    assert worker._LOOP is None
+    assert loop.is_closed()
+    assert _loop_threads() == []
@@ -1,4 +1,5 @@
 import asyncio
+import threading
 import time
 import logging
 from datetime import datetime
@@ -8,50 +9,87 @@ from celery.signals import worker_process_init, worker_shutdown
 from app.queue import celery
 from app.ai import review_code_sync
 from app import db as dbmod
-from app.db import init_db_sync, close_db_sync
-from app.cache import init_cache, close_cache, cache_set_review_id
+from app.db import init_db_sync, close_db_sync, review_summary
+from app.cache import init_cache, close_cache
 from app.events import init_events, close_events, publish_status
+from app.batching import get_batcher, close_batcher
+from app.redis_pool import close_pools
 
 logger = logging.getLogger(__name__)
 
 _LOOP: asyncio.AbstractEventLoop | None = None
+_LOOP_THREAD: threading.Thread | None = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    """
+    Start the process-wide event loop on a daemon thread, once.
+
+    Tasks submit coroutines to it with run_coroutine_threadsafe, so with a
+    thread pool (--pool=threads) several reviews share one loop and overlap
+    their Mongo/Redis I/O.
+    """
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="worker-asyncio", daemon=True
+            )
+            thread.start()
+            try:
+                init_db_sync()
+                asyncio.run_coroutine_threadsafe(init_cache(), loop).result()
+                asyncio.run_coroutine_threadsafe(init_events(), loop).result()
+            except Exception:
+                # Don't leave a half-initialized loop running; the next task retries
+                _teardown(loop, thread)
+                raise
+            _LOOP, _LOOP_THREAD = loop, thread
+    return _LOOP
+
+
+def _teardown(loop: asyncio.AbstractEventLoop, thread: threading.Thread):
+    """Close clients bound to ``loop``, then stop and close the loop itself."""
+    try:
+        for close in (close_batcher, close_events, close_cache, close_pools):
+            try:
+                asyncio.run_coroutine_threadsafe(close(), loop).result(timeout=5)
+            except Exception as e:
+                logger.error(f"worker_teardown_error step={close.__name__} error={str(e)}")
+        close_db_sync()
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if thread.is_alive():
+            logger.error("worker_loop_stop_timeout thread_alive=true loop_closed=false")
+        else:
+            loop.close()
 
 
 @worker_process_init.connect
 def _on_worker_process_init(**_):
-    global _LOOP
-    if _LOOP is None:
-        _LOOP = asyncio.new_event_loop()
-        asyncio.set_event_loop(_LOOP)
-        init_db_sync()
-        _LOOP.run_until_complete(init_cache())
-        _LOOP.run_until_complete(init_events())
+    _ensure_loop()
 
 
 @worker_shutdown.connect
 def _on_worker_shutdown(**_):
-    global _LOOP
-    try:
-        if _LOOP is not None:
-            _LOOP.run_until_complete(close_events())
-            _LOOP.run_until_complete(close_cache())
-        close_db_sync()
-    finally:
-        if _LOOP is not None:
-            _LOOP.close()
-            _LOOP = None
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            close_db_sync()
+            return
+        loop, thread = _LOOP, _LOOP_THREAD
+        _LOOP, _LOOP_THREAD = None, None
+        _teardown(loop, thread)
 
 
 @celery.task(name="process_review")
 def process_review(submission_id: str):
-    global _LOOP
-    if _LOOP is None:
-        _LOOP = asyncio.new_event_loop()
-        asyncio.set_event_loop(_LOOP)
-        init_db_sync()
-        _LOOP.run_until_complete(init_cache())
-        _LOOP.run_until_complete(init_events())
-    return _LOOP.run_until_complete(_run(submission_id))
+    loop = _ensure_loop()
+    fut = asyncio.run_coroutine_threadsafe(_run(submission_id), loop)
+    return fut.result()
 
 
 async def _run(submission_id: str):
@@ -69,33 +107,36 @@ async def _run(submission_id: str):
     logger.info(f"status_transition submission_id={submission_id} status=pending->in_progress")
 
     try:
-        data = review_code_sync(sub["language"], sub["code"])
+        # Blocking OpenAI call runs off-loop so other in-flight reviews keep going
+        data = await asyncio.to_thread(review_code_sync, sub["language"], sub["code"])
         doc = {
             "submission_id": sub["_id"],
             **data,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.utcnow(),
         }
         ins = await dbmod.reviews.insert_one(doc)
+        review_id = str(ins.inserted_id)
+        # Same shape stream_review would load from Mongo, so SSE can skip the read
+        review_out = {**doc, "_id": review_id, "submission_id": submission_id}
 
+        duration_ms = int((time.time() - start_time) * 1000)
+        # Submission update, cache write and completion event are batched with
+        # other reviews finishing at the same time; returns once committed
         code_hash = sub.get("code_hash")
-        cache_hit = False
-        if code_hash:
-            await cache_set_review_id(code_hash, str(ins.inserted_id))
-            cache_hit = True
-
-        await dbmod.submissions.update_one(
-            {"_id": sub["_id"]},
+        batcher = await get_batcher()
+        await batcher.submit(
+            sub["_id"],
             {
-                "$set": {
-                    "status": "completed",
-                    "review_id": ins.inserted_id,
-                    "updated_at": datetime.utcnow().isoformat(),
-                }
+                "status": "completed",
+                "review_id": ins.inserted_id,
+                "updated_at": datetime.utcnow(),
+                **review_summary(data),
             },
+            review_id,
+            {"duration_ms": duration_ms, "review": review_out},
+            code_hash=code_hash,
         )
-        duration_ms = int((time.time() - start_time) * 1000)
-        await publish_status(submission_id, "completed", {"review_id": str(ins.inserted_id), "duration_ms": duration_ms})
-        logger.info(f"status_transition submission_id={submission_id} status=in_progress->completed duration_ms={duration_ms} cache_hit={cache_hit} review_id={str(ins.inserted_id)}")
+        logger.info(f"status_transition submission_id={submission_id} status=in_progress->completed duration_ms={duration_ms} cache_hit={bool(code_hash)} review_id={review_id}")
     except Exception as e:
         error_msg = str(e)
         duration_ms = int((time.time() - start_time) * 1000)
@@ -105,7 +146,7 @@ async def _run(submission_id: str):
                 "$set": {
                     "status": "failed",
                     "error": error_msg,
-                    "updated_at": datetime.utcnow().isoformat(),
+                    "updated_at": datetime.utcnow(),
                 }
             },
         )